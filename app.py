@@ -5,6 +5,7 @@ VURC 2026-2027 Override 实时战绩分析 Web 看板（Dash 前端）
 
 架构：
   - 使用 dcc.Interval 每 30 秒从 dashboard_data.csv 读取数据
+  - 解析后的 DataFrame 按文件 mtime 缓存在服务端，dcc.Store 只传递版本号
   - 使用 plotly.graph_objects 渲染气泡散点图
   - 右上角"队伍对比面板"可输入队伍编号进行多队对比
 
@@ -28,6 +29,9 @@ VURC 2026-2027 Override 实时战绩分析 Web 看板（Dash 前端）
     当前公共数据源不需要 ROBOTEVENTS_TOKEN
 """
 
+import datetime
+import functools
+import hashlib
 import threading
 import webbrowser
 from pathlib import Path
@@ -35,12 +39,34 @@ from pathlib import Path
 import dash
 import numpy as np
 import pandas as pd
+import plotly.colors
 import plotly.graph_objects as go
 from dash import Input, Output, State, dcc, html, dash_table, callback_context
 
 # ─── 路径配置 ────────────────────────────────────────────────────────────────────
 DATA_CSV = Path(__file__).parent / "dashboard_data.csv"
 
+# CSV 列类型：显式声明后 C 解析器不再逐列推断类型；数值范围很小，用窄类型即可
+CSV_DTYPES = {
+    "team_name":            str,
+    "strength_of_schedule": "float32",
+    "elo":                  "float32",
+    "driver_skills":        "int16",
+    "programming_skills":   "int16",
+}
+
+# 未选中任何队伍时，只为 Elo 前若干名绘制文字标签（逐点标签的排版开销随点数线性增长）
+LABEL_TOP_ELO = 20
+
+# 队伍数超过该值时服务端降采样：保留选中队伍 + Elo 前若干名 + 其余队伍的固定随机样本
+DOWNSAMPLE_MAX_POINTS = 2000
+DOWNSAMPLE_TOP_ELO    = 500
+DOWNSAMPLE_RANDOM     = 1500
+
+# 无 skills 数据队伍的颜色
+NO_SKILLS_COLOR = "#BBBBBB"
+
+
 # ─── 初始化 Dash ─────────────────────────────────────────────────────────────────
 app = dash.Dash(__name__, title="VURC 2026-2027 Override 战绩看板")
 server = app.server
@@ -120,31 +146,60 @@ app.layout = html.Div(
 
         # ── 每 30 秒触发一次刷新（避免 callback 超时）
         dcc.Interval(id="interval", interval=30_000, n_intervals=0),
-        # ── 隐藏存储：缓存 CSV 数据供多个回调使用
+        # ── 隐藏存储：只保存数据版本号（CSV 的 mtime），DataFrame 缓存在服务端
         dcc.Store(id="cached-data"),
     ],
 )
 
 
-# ─── 回调 1：定时读取 CSV，缓存到 dcc.Store ──────────────────────────────────────
+# ─── 服务端数据缓存 ──────────────────────────────────────────────────────────────
+@functools.lru_cache(maxsize=4)
+def _load_df(path: str, mtime: float) -> pd.DataFrame:
+    """按 (路径, 修改时间) 缓存解析结果，文件未变化时直接复用同一个 DataFrame。"""
+    return pd.read_csv(path, dtype=CSV_DTYPES, memory_map=True)
+
+
+def _cached_df(token: dict) -> pd.DataFrame:
+    """根据 dcc.Store 中的版本号取回 DataFrame（调用方只读，不要原地修改）。"""
+    mtime = token.get("mtime")
+    if mtime is None:
+        return _mock_df()
+    return _load_df(str(DATA_CSV), mtime)
+
+
+@functools.lru_cache(maxsize=4)
+def _team_options(mtime: float | None) -> tuple[str, list[dict]]:
+    """按数据版本缓存 Dropdown 选项，返回 (队伍集合哈希, 选项列表)。
+
+    哈希用十六进制字符串，经浏览器往返后不会像大整数那样丢失精度。
+    """
+    teams = sorted(_cached_df({"mtime": mtime})["team_name"].tolist())
+    teams_hash = hashlib.blake2b("\n".join(teams).encode("utf-8"), digest_size=8).hexdigest()
+    return teams_hash, [{"label": t, "value": t} for t in teams]
+
+
+# ─── 回调 1：定时检查 CSV，把数据版本号写入 dcc.Store ────────────────────────────
 @app.callback(
     Output("cached-data",       "data"),
     Output("last-update-label", "children"),
     Output("status-bar",        "children"),
     Output("compare-teams",     "options"),
     Input("interval",           "n_intervals"),
+    State("cached-data",        "data"),
 )
-def load_data(_n: int):
-    import datetime
+def load_data(_n: int, prev_token: dict | None):
     now_str = datetime.datetime.now().strftime("%H:%M:%S")
     status  = ""
+    token   = {"mtime": None}   # mtime 为 None 表示使用示例数据
 
     if not DATA_CSV.exists():
         status = f"⚠️  未找到 {DATA_CSV.name}，请先运行 data_fetcher.py 生成数据。"
         df = _mock_df()
     else:
         try:
-            df = pd.read_csv(DATA_CSV)
+            mtime = DATA_CSV.stat().st_mtime
+            df = _load_df(str(DATA_CSV), mtime)
+            token = {"mtime": mtime}
         except Exception as exc:
             status = f"⚠️  读取数据失败: {exc}"
             df = _mock_df()
@@ -153,11 +208,69 @@ def load_data(_n: int):
     if not required.issubset(df.columns):
         status = "⚠️  CSV 列结构不完整，请检查 data_fetcher.py 输出。"
         df = _mock_df()
-
-    # 构建 Dropdown 选项
-    options = [{"label": t, "value": t} for t in sorted(df["team_name"].tolist())]
-
-    return df.to_dict("records"), f"最近更新: {now_str}", status, options
+        token = {"mtime": None}
+
+    # 构建 Dropdown 选项；队伍集合与浏览器端已有的一致时不再重复下发
+    teams_hash, options = _team_options(token["mtime"])
+    token["teams"] = teams_hash
+    if prev_token and prev_token.get("teams") == teams_hash:
+        options = dash.no_update
+
+    # 数据版本未变化时不写 Store，下游的绘图 / 表格回调也就不会被触发
+    if prev_token == token:
+        token = dash.no_update
+
+    return token, f"最近更新: {now_str}", status, options
+
+
+# ─── 绘图工具 ────────────────────────────────────────────────────────────────────
+def _driver_colorscale(d_min: float, d_max: float) -> tuple[list, float, float]:
+    """在 Plasma 色阶下方拼接一段灰色，返回 (colorscale, 灰色对应的数值, 色阶上限)。
+
+    灰色数值略低于最小 driver 分数，无 skills 的队伍取该值即可与其他队伍共用一条 trace。
+    所有 driver 分数相同时把上限抬高 gap，避免 Plasma 段宽度为 0、色条只剩灰色。
+    """
+    gap = max((d_max - d_min) * 0.02, 1.0)
+    if d_max == d_min:
+        d_max = d_min + gap
+    grey_value = d_min - gap
+    split = gap / (d_max - grey_value)
+    plasma = plotly.colors.sequential.Plasma
+    colorscale = [[0.0, NO_SKILLS_COLOR], [split, NO_SKILLS_COLOR]]
+    # linspace 保证最后一个断点恰好是 1.0（plotly 要求色阶以 0 开始、以 1 结束）
+    stops = np.linspace(split, 1.0, len(plasma)).tolist()
+    colorscale += [[stop, c] for stop, c in zip(stops, plasma)]
+    return colorscale, grey_value, d_max
+
+
+def _downsample(df: pd.DataFrame, selected: set) -> pd.DataFrame:
+    """队伍过多时减少发送到浏览器的点数；选中队伍与高 Elo 队伍始终保留。"""
+    if len(df) <= DOWNSAMPLE_MAX_POINTS:
+        return df
+    keep = pd.concat([
+        df[df["team_name"].isin(selected)],
+        df.nlargest(DOWNSAMPLE_TOP_ELO, "elo"),
+        df.sample(n=DOWNSAMPLE_RANDOM, random_state=0),
+    ])
+    return keep[~keep.index.duplicated()].sort_index()
+
+
+def _border_style(names: np.ndarray, has_skills: np.ndarray, selected: set):
+    """返回 (边框宽度, 边框颜色)：选中队伍加粗红框，其余为淡色细边框。"""
+    border_width = 0.5
+    border_color = np.where(has_skills, "rgba(0,0,0,0.25)", "rgba(0,0,0,0.1)")
+    if selected:
+        sel_mask = np.isin(names, list(selected))
+        border_width = np.where(sel_mask, 3.0, 0.5)
+        border_color = np.where(sel_mask, "#FF0000", border_color)
+    return border_width, border_color
+
+
+def _label_rows(df: pd.DataFrame, selected: set) -> pd.DataFrame:
+    """需要显示文字标签的队伍：有选中队伍时只标注选中队伍，否则标注 Elo 前几名。"""
+    if selected:
+        return df[df["team_name"].isin(selected)]
+    return df.nlargest(LABEL_TOP_ELO, "elo")
 
 
 # ─── 回调 2：绘图（数据变化或选中队伍变化时触发）────────────────────────────────
@@ -166,43 +279,74 @@ def load_data(_n: int):
     Input("cached-data",   "data"),
     Input("compare-teams", "value"),
 )
-def render_chart(records, selected_teams):
-    if not records:
+def render_chart(token, selected_teams):
+    if not token:
         return go.Figure()
 
-    df = pd.DataFrame(records)
+    df = _cached_df(token)
     selected = set(selected_teams or [])
 
-    has_skills = df[df["programming_skills"] > 0].copy()
-    no_skills  = df[df["programming_skills"] == 0].copy()
+    # 仅选中队伍变化且未降采样（点集不变）时，用 Patch 只更新边框与标签
+    if (callback_context.triggered_id == "compare-teams"
+            and not df.empty and len(df) <= DOWNSAMPLE_MAX_POINTS):
+        border_width, border_color = _border_style(
+            df["team_name"].to_numpy(), (df["programming_skills"] > 0).to_numpy(), selected,
+        )
+        patch = dash.Patch()
+        patch["data"][0]["marker"]["line"] = dict(width=border_width, color=border_color)
+        labels = _label_rows(df, selected)
+        patch["data"][1]["x"] = labels["strength_of_schedule"].to_numpy()
+        patch["data"][1]["y"] = labels["elo"].to_numpy()
+        patch["data"][1]["text"] = labels["team_name"].to_numpy()
+        return patch
 
     fig = go.Figure()
 
-    # ── 1) 有 skills 的队伍：半径 ∝ √(programming_skills)
-    if not has_skills.empty:
-        bubble_size = np.sqrt(has_skills["programming_skills"].values) * 2
-
-        # 高亮选中队伍：加粗边框
-        if selected:
-            border_width = [3.0 if t in selected else 0.5
-                           for t in has_skills["team_name"]]
-            border_color = ["#FF0000" if t in selected else "rgba(0,0,0,0.25)"
-                           for t in has_skills["team_name"]]
+    # ── 所有队伍合并为一条 trace：有 skills 的队伍半径 ∝ √(programming_skills)、
+    #    颜色 = driver_skills；无 skills 的队伍为灰色小点（色阶底部的灰色段）
+    if not df.empty:
+        plot_df = _downsample(df, selected)
+
+        # 只读访问，直接取底层 numpy 数组，不复制 DataFrame
+        names  = plot_df["team_name"].to_numpy()
+        sos    = plot_df["strength_of_schedule"].to_numpy()
+        elo    = plot_df["elo"].to_numpy()
+        driver = plot_df["driver_skills"].to_numpy()
+        prog   = plot_df["programming_skills"].to_numpy()
+
+        has_skills = prog > 0
+        # 在同一个 float32 缓冲区上原地开方、缩放，不产生中间数组
+        bubble_size = prog.astype(np.float32)
+        np.sqrt(bubble_size, out=bubble_size)
+        bubble_size *= 2
+        bubble_size[~has_skills] = 3
+
+        if has_skills.any():
+            d_min, d_max = driver[has_skills].min(), driver[has_skills].max()
+            colorscale, grey_value, c_max = _driver_colorscale(float(d_min), float(d_max))
+            marker_color = np.where(has_skills, driver, grey_value)
+            color_range = dict(cmin=grey_value, cmax=c_max)
         else:
-            border_width = 0.5
-            border_color = "rgba(0,0,0,0.25)"
+            colorscale, marker_color, color_range = None, NO_SKILLS_COLOR, {}
 
-        fig.add_trace(go.Scatter(
-            x=has_skills["strength_of_schedule"],
-            y=has_skills["elo"],
-            mode="markers+text",
-            text=has_skills["team_name"],
-            textposition="top center",
-            textfont=dict(size=9, color="#333333"),
+        # 高亮选中队伍：加粗边框
+        border_width, border_color = _border_style(names, has_skills, selected)
+
+        # 悬停文字在服务端一次性格式化，浏览器端不再逐点解析 hovertemplate
+        hover_text = [
+            f"<b>{n}</b><br>SoS: {s:.4f}<br>Elo: {e:.1f}<br>"
+            + (f"Driver: {d}<br>Programming: {p}" if h else "Skills: N/A")
+            for n, s, e, d, p, h in zip(names, sos, elo, driver, prog, has_skills)
+        ]
+
+        fig.add_trace(go.Scattergl(
+            x=sos,
+            y=elo,
+            mode="markers",
             marker=dict(
                 size=bubble_size,
-                color=has_skills["driver_skills"],
-                colorscale="Plasma",
+                color=marker_color,
+                colorscale=colorscale,
                 colorbar=dict(
                     title=dict(text="driver_skills", side="top"),
                     tickvals=[0, 20, 40, 60, 80, 100, 120, 140],
@@ -210,52 +354,24 @@ def render_chart(records, selected_teams):
                     len=0.75, thickness=16,
                 ),
                 line=dict(width=border_width, color=border_color),
-                showscale=True,
-            ),
-            hovertemplate=(
-                "<b>%{text}</b><br>"
-                "SoS: %{x:.4f}<br>"
-                "Elo: %{y:.1f}<br>"
-                "Driver: %{customdata[0]}<br>"
-                "Programming: %{customdata[1]}"
-                "<extra></extra>"
+                showscale=colorscale is not None,
+                **color_range,
             ),
-            customdata=has_skills[["driver_skills", "programming_skills"]].values,
-            name="有 Skills 数据",
+            hovertext=hover_text,
+            hovertemplate="%{hovertext}<extra></extra>",
+            name="队伍",
         ))
 
-    # ── 2) 无 skills 的队伍：灰色小点 + 名称黑色
-    if not no_skills.empty:
-        if selected:
-            border_width_ns = [3.0 if t in selected else 0.5
-                               for t in no_skills["team_name"]]
-            border_color_ns = ["#FF0000" if t in selected else "rgba(0,0,0,0.1)"
-                               for t in no_skills["team_name"]]
-        else:
-            border_width_ns = 0.5
-            border_color_ns = "rgba(0,0,0,0.1)"
-
+        # ── 文字标签单独放在一条很小的 trace 中，只包含选中队伍（或 Elo 前几名）
+        labels = _label_rows(df, selected)
         fig.add_trace(go.Scatter(
-            x=no_skills["strength_of_schedule"],
-            y=no_skills["elo"],
-            mode="markers+text",
-            text=no_skills["team_name"],
+            x=labels["strength_of_schedule"],
+            y=labels["elo"],
+            text=labels["team_name"],
+            mode="text",
             textposition="top center",
             textfont=dict(size=9, color="#333333"),
-            marker=dict(
-                size=3,
-                color="#BBBBBB",
-                symbol="circle",
-                line=dict(width=border_width_ns, color=border_color_ns),
-            ),
-            hovertemplate=(
-                "<b>%{text}</b><br>"
-                "SoS: %{x:.4f}<br>"
-                "Elo: %{y:.1f}<br>"
-                "Skills: N/A"
-                "<extra></extra>"
-            ),
-            name="无 Skills 数据",
+            hoverinfo="skip",
             showlegend=False,
         ))
 
@@ -267,11 +383,15 @@ def render_chart(records, selected_teams):
         showgrid=True, gridcolor="white", gridwidth=1,
         zeroline=False, showline=False,
         tickformat=".2f",
+        showspikes=False,
     )
 
-    # ── Y 轴（动态范围）
-    elo_min = df["elo"].min()
-    elo_max = df["elo"].max()
+    # ── Y 轴（动态范围；直接在 numpy 数组上取最值）
+    elo_all = df["elo"].to_numpy()
+    if elo_all.size:
+        elo_min, elo_max = float(elo_all.min()), float(elo_all.max())
+    else:
+        elo_min = elo_max = 1500.0
     elo_pad = max((elo_max - elo_min) * 0.05, 10)
     fig.update_yaxes(
         title_text="elo",
@@ -279,6 +399,7 @@ def render_chart(records, selected_teams):
         dtick=50,
         showgrid=True, gridcolor="white", gridwidth=1,
         zeroline=False, showline=False,
+        showspikes=False,
     )
 
     # ── 全局布局
@@ -296,6 +417,11 @@ def render_chart(records, selected_teams):
         margin=dict(l=60, r=130, t=55, b=55),
         font=dict(family="'Segoe UI', Arial, sans-serif"),
         showlegend=False,
+        # 只查找最近点、不画辅助线，避免密集区域悬停时逐点扫描
+        hovermode="closest",
+        spikedistance=0,
+        # 定时刷新时保留用户的缩放 / 平移状态，Plotly 只做增量更新
+        uirevision="stable",
     )
 
     return fig
@@ -307,38 +433,36 @@ def render_chart(records, selected_teams):
     Input("cached-data",    "data"),
     Input("compare-teams",  "value"),
 )
-def render_compare_table(records, selected_teams):
-    if not records or not selected_teams:
+def render_compare_table(token, selected_teams):
+    if not token or not selected_teams:
         return html.P("请在上方选择要对比的队伍", style={"color": "#aaa", "fontSize": "12px", "textAlign": "center"})
 
-    df = pd.DataFrame(records)
-    sel = df[df["team_name"].isin(selected_teams)].copy()
+    df = _cached_df(token)
+    mask = df["team_name"].isin(selected_teams)
 
-    if sel.empty:
+    if not mask.any():
         return html.P("未找到选中的队伍", style={"color": "#c0392b", "fontSize": "12px"})
 
-    # 按 Elo 降序排列
-    sel = sel.sort_values("elo", ascending=False)
+    # 计算排名（Elo 相同的队伍并列），只取选中队伍，按 Elo 降序排列
+    ranks = df["elo"].rank(method="min", ascending=False).astype(int)
+    sel = df[mask].assign(rank=ranks[mask]).sort_values("elo", ascending=False)
 
-    # 计算排名
-    df_sorted = df.sort_values("elo", ascending=False).reset_index(drop=True)
-    df_sorted["rank"] = df_sorted.index + 1
-    rank_map = dict(zip(df_sorted["team_name"], df_sorted["rank"]))
+    cell_style = {"padding": "4px 6px", "fontSize": "12px", "borderBottom": "1px solid #eee"}
+    header_style = {**cell_style, "fontWeight": "bold", "color": "#555", "borderBottom": "2px solid #ccc"}
+    team_style = {**cell_style, "fontWeight": "bold", "color": "#1a1a2e"}
+    rank_style = {**cell_style, "color": "#888"}
 
     rows = []
-    for _, r in sel.iterrows():
+    for r in sel.itertuples(index=False):
         rows.append(html.Tr([
-            html.Td(r["team_name"], style={"fontWeight": "bold", "color": "#1a1a2e"}),
-            html.Td(f"#{rank_map.get(r['team_name'], '?')}", style={"color": "#888"}),
-            html.Td(f"{r['elo']:.0f}"),
-            html.Td(f"{r['strength_of_schedule']:.3f}"),
-            html.Td(str(int(r["driver_skills"]))),
-            html.Td(str(int(r["programming_skills"]))),
+            html.Td(r.team_name, style=team_style),
+            html.Td(f"#{r.rank}", style=rank_style),
+            html.Td(f"{r.elo:.0f}", style=cell_style),
+            html.Td(f"{r.strength_of_schedule:.3f}", style=cell_style),
+            html.Td(str(int(r.driver_skills)), style=cell_style),
+            html.Td(str(int(r.programming_skills)), style=cell_style),
         ]))
 
-    cell_style = {"padding": "4px 6px", "fontSize": "12px", "borderBottom": "1px solid #eee"}
-    header_style = {**cell_style, "fontWeight": "bold", "color": "#555", "borderBottom": "2px solid #ccc"}
-
     table = html.Table(
         style={"width": "100%", "borderCollapse": "collapse", "marginTop": "4px"},
         children=[
@@ -354,11 +478,6 @@ def render_compare_table(records, selected_teams):
         ],
     )
 
-    # 添加样式到所有 td
-    for row in rows:
-        for td in row.children:
-            td.style = cell_style
-
     return table
 
 
@@ -375,7 +494,7 @@ def _mock_df() -> pd.DataFrame:
                                   82,    60,      90,    68,     55],
         "programming_skills":   [105,   85,      60,     95,     70,
                                   75,    40,      65,    50,     35],
-    })
+    }).astype(CSV_DTYPES)
 
 
 # ─── 入口 ────────────────────────────────────────────────────────────────────────
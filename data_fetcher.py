@@ -11,25 +11,38 @@ data_fetcher.py
 使用：
   python data_fetcher.py            # 立即抓取一次
   python data_fetcher.py --loop 300 # 每 300 秒循环抓取
+  python data_fetcher.py --force    # 忽略本地 API 缓存，全部重新下载
 
 依赖：
-  pip install requests pandas python-dotenv
+  pip install requests pandas python-dotenv orjson
 """
 
 import argparse
+import array
+import base64
 import datetime
+import functools
+import hashlib
 import logging
+import math
 import os
 import re
+import sqlite3
+import sys
+import threading
 import time
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-
+from typing import NamedTuple
+from urllib.parse import urlencode
+
 import numpy as np
+import orjson
 import pandas as pd
-import plotly.graph_objects as go
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 从当前目录的 .env 文件加载环境变量（保留兼容，但公共数据源不需要 Token）
 load_dotenv(Path(__file__).parent / ".env")
@@ -44,9 +57,23 @@ SEASON_YEAR     = 2026
 SEASON_LABEL    = f"{SEASON_YEAR}-{SEASON_YEAR + 1}"
 GAME_NAME       = "Override"
 OUTPUT_CSV      = Path(__file__).parent / "dashboard_data.csv"
+CACHE_DB        = Path(__file__).parent / ".cache" / "events_vex.sqlite"
+ELO_STATE       = Path(__file__).parent / ".cache" / "elo_state.npz"
+ELO_STATE_VERSION = 1        # Elo 更新规则或状态格式变化时递增，使旧的增量状态失效
+FINAL_AFTER_DAYS = 7         # 赛事结束超过 N 天视为成绩已定，缓存永不过期
+PROGRAMS_TTL    = 7 * 86400  # programs/seasons 列表基本不变
+EVENTS_TTL      = 3600       # 赛季赛事列表，新增赛事最多延迟 1 小时出现
+NOT_FOUND_TTL   = 86400      # 404 记录最多缓存 1 天：成绩可能晚于赛事结束才上传
 K_FACTOR        = 32
 INITIAL_ELO     = 1500
+LN10_OVER_400   = math.log(10) / 400   # 10 ** (d / 400) == exp(d * LN10_OVER_400)
 REQUEST_INTERVAL = float(os.environ.get("EVENTS_VEX_REQUEST_INTERVAL", "1.0"))
+REQUEST_BURST    = max(1, int(os.environ.get("EVENTS_VEX_REQUEST_BURST", "5")))   # 至少为 1，否则桶永远取不到令牌
+# 自适应限速的速率上限（次/秒）；默认不超过 REQUEST_INTERVAL 对应的速率，429 时减半后再逐步恢复
+MAX_REQUEST_RATE = float(os.environ.get("EVENTS_VEX_MAX_RATE", "0")) or 1.0 / max(REQUEST_INTERVAL, 1e-3)
+MAX_WORKERS      = int(os.environ.get("EVENTS_VEX_MAX_WORKERS", "8"))
+PAGE_SIZE          = 1000       # 分页大小；服务器拒绝时回退到 FALLBACK_PAGE_SIZE
+FALLBACK_PAGE_SIZE = 250
 
 logging.basicConfig(
     level=logging.INFO,
@@ -60,6 +87,151 @@ class NotFoundError(RuntimeError):
     """HTTP 404/410 等资源不存在错误，不应重试。"""
 
 
+class ClientError(RuntimeError):
+    """除 404/410 外的 HTTP 4xx（含重试耗尽的 429）；status 为 HTTP 状态码。"""
+
+    def __init__(self, message: str, status: int) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class InvalidResponseError(RuntimeError):
+    """响应状态正常但内容不是 JSON（维护页、登录页等），不写入缓存。"""
+
+
+def _loads(content: bytes, url: str):
+    """解析 JSON 响应体；解析失败抛出 InvalidResponseError，由各赛事的跳过逻辑统一处理。"""
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError as exc:
+        raise InvalidResponseError(f"响应不是 JSON: {url} ({exc})") from exc
+
+
+class TokenBucket:
+    """线程安全的令牌桶：允许最多 capacity 个请求的突发，长期速率为 refill_rate 个/秒。
+
+    速率按 AIMD 自适应：收到 429 时 throttle() 把速率减半（不低于 min_rate），
+    之后每次成功请求 recover() 加回 step，直到 max_rate。
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        refill_rate: float,
+        *,
+        max_rate: float | None = None,
+        step: float = 0.1,
+    ) -> None:
+        # 容量小于 1 时 tokens 永远达不到 1，acquire() 会无限等待
+        self.capacity = float(max(capacity, 1))
+        self.refill_rate = refill_rate
+        self.max_rate = max(max_rate or refill_rate, refill_rate)
+        self.min_rate = refill_rate / 16
+        self.step = step
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def throttle(self) -> None:
+        """服务器限流：速率减半并清空突发额度。"""
+        with self._lock:
+            self.refill_rate = max(self.min_rate, self.refill_rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+        log.info("触发限流，请求速率降至 %.2f 次/秒", self.refill_rate)
+
+    def recover(self) -> None:
+        """请求成功：速率线性恢复。"""
+        if self.refill_rate < self.max_rate:
+            with self._lock:
+                self.refill_rate = min(self.max_rate, self.refill_rate + self.step)
+
+    def acquire(self) -> None:
+        """取走一个令牌，桶空时阻塞到下一个令牌补充为止。"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+
+class _ThrottleRetry(Retry):
+    """urllib3 在连接层处理 429 重试；这里在每次 429 时额外通知令牌桶降速。"""
+
+    def __init__(self, *args, on_throttle=None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.on_throttle = on_throttle
+
+    def new(self, **kwargs) -> "_ThrottleRetry":
+        retry = super().new(**kwargs)
+        retry.on_throttle = self.on_throttle
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and response.status == 429 and self.on_throttle is not None:
+            self.on_throttle()
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class CacheEntry(NamedTuple):
+    payload: bytes
+    etag: str | None
+    last_modified: str | None
+    expires_at: float
+
+
+class ResponseCache:
+    """API 响应的 SQLite 磁盘缓存。
+
+    以 url + 排序后的 params 为键保存原始响应体和 ETag / Last-Modified；
+    过期后用条件请求重新验证，服务器返回 304 时直接复用本地内容。
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, payload BLOB NOT NULL, etag TEXT, last_modified TEXT,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: dict | None) -> str:
+        return f"{url}?{urlencode(sorted((params or {}).items()))}"
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, etag, last_modified, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, *entry),
+            )
+
+
+def _event_is_final(event: dict) -> bool:
+    """赛事日期早于今天 FINAL_AFTER_DAYS 天以上时，认为其数据不会再变化。"""
+    raw = str(event.get("end") or event.get("end_date") or event.get("date") or "")[:10]
+    try:
+        day = datetime.date.fromisoformat(raw)
+    except ValueError:
+        return False
+    return day < datetime.date.today() - datetime.timedelta(days=FINAL_AFTER_DAYS)
+
+
 def _event_entity_id(event: dict) -> int:
     """events.vex.com 公共列表里的 event_entity_id 才是 /api/v2 使用的赛事 id。"""
     return int(event.get("event_entity_id") or event.get("id"))
@@ -70,15 +242,48 @@ class EventsVexClient:
 
     非 /api/v2 的 JSON 端点公开可读；/api/v2 赛事端点需要先访问公开赛事页，
     用匿名 session cookie + 页面 CSRF token 作为 Ajax 请求上下文。
+
+    客户端可被多个线程共享：所有请求先从同一个令牌桶取令牌，而不是每个线程各自 sleep。
     """
 
     def __init__(self) -> None:
         self.session = requests.Session()
+        self._bucket = TokenBucket(
+            capacity=REQUEST_BURST,
+            refill_rate=1.0 / max(REQUEST_INTERVAL, 1e-3),
+            max_rate=MAX_REQUEST_RATE,
+        )
+        # 连接池至少容纳全部工作线程，避免并发时连接被丢弃后重新握手；
+        # 连接错误 / 429 / 5xx 由 urllib3 在连接层按指数退避重试，429 优先遵守 Retry-After 并降低令牌桶速率
+        retry = _ThrottleRetry(
+            total=8,
+            backoff_factor=1.0,
+            backoff_max=30,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            on_throttle=self._bucket.throttle,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(MAX_WORKERS, 10), max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             "Accept": "application/json, text/plain, */*",
+            "Accept-Encoding": "gzip, deflate",
             "User-Agent": "VEX-rankings/1.0 (+https://github.com/hlzx-cpu/VEX-rankings)",
         })
         self._event_context: dict[int, dict[str, str]] = {}
+        self._context_locks: dict[int, threading.Lock] = {}
+        self.cache: ResponseCache | None = None
+        self.force_refresh = False
+        # 分页请求使用独立线程池：调用方本身可能运行在 _parallel_map 的线程里，
+        # 若在同一个池里等待子任务会互相占满线程而死锁
+        self._page_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="page")
+        # 默认页大小在第一次分页成功（或回退）后确认，之前的分页请求串行探测
+        self._page_size = PAGE_SIZE
+        self._page_size_settled = False
+        self._page_size_lock = threading.Lock()
 
     def request(
         self,
@@ -89,56 +294,119 @@ class EventsVexClient:
         json_payload: dict | None = None,
         headers: dict | None = None,
     ) -> requests.Response:
-        max_attempts = 8
-        for attempt in range(max_attempts):
-            try:
-                response = self.session.request(
-                    method,
-                    url,
-                    params=params,
-                    json=json_payload,
-                    headers=headers,
-                    timeout=30,
-                )
-                if response.status_code == 429:
-                    retry_after = response.headers.get("Retry-After")
-                    wait = int(retry_after) if retry_after else max(30, 30 * (attempt + 1))
-                    log.warning("触发 429 速率限制，等待 %d 秒再重试 (attempt=%d)...", wait, attempt + 1)
-                    time.sleep(wait)
-                    continue
-                if response.status_code in {404, 410}:
-                    raise NotFoundError(f"HTTP {response.status_code}: {url}")
-                if 400 <= response.status_code < 500:
-                    raise RuntimeError(f"HTTP {response.status_code}: {url} - {response.text[:200]}")
-                response.raise_for_status()
-                time.sleep(REQUEST_INTERVAL)
-                return response
-            except NotFoundError:
-                raise
-            except requests.RequestException as exc:
-                log.warning("请求失败 (%s) attempt=%d: %s", url, attempt + 1, exc)
-                if attempt < max_attempts - 1:
-                    time.sleep(min(2 ** attempt, 30))
-        raise RuntimeError(f"API 请求多次失败: {url}")
-
-    def get_public(self, path: str, params: dict | None = None):
+        """发送请求；重试已由 session 上挂载的 urllib3 Retry 完成，这里只负责把结果映射为异常。"""
+        self._bucket.acquire()
+        try:
+            response = self.session.request(
+                method,
+                url,
+                params=params,
+                json=json_payload,
+                headers=headers,
+                timeout=30,
+            )
+        except requests.RequestException as exc:
+            raise RuntimeError(f"API 请求多次失败: {url} ({exc})") from exc
+        if response.status_code in {404, 410}:
+            raise NotFoundError(f"HTTP {response.status_code}: {url}")
+        if response.status_code >= 400:
+            message = f"HTTP {response.status_code}: {url} - {response.text[:200]}"
+            if response.status_code < 500:
+                raise ClientError(message, response.status_code)
+            raise RuntimeError(message)
+        self._bucket.recover()
+        return response
+
+    def get_json(self, url: str, params: dict | None = None, *, headers=None, ttl: float = 0.0):
+        """带磁盘缓存的 GET。
+
+        缓存未过期时不发请求；过期后带 If-None-Match / If-Modified-Since 重新验证。
+        headers 可以是返回请求头的函数，只有真正需要联网时才调用（如获取 CSRF）。
+        ttl 为缓存有效秒数，float("inf") 表示永不过期。
+        404/410 同样被缓存（空 payload），但有效期不超过 NOT_FOUND_TTL，期间直接抛出 NotFoundError。
+        """
+        key = ResponseCache.key(url, params)
+        cached = None
+        if self.cache is not None and not self.force_refresh:
+            cached = self.cache.get(key)
+            if cached and cached.payload:
+                try:
+                    data = _loads(cached.payload, url)
+                except InvalidResponseError:
+                    cached = None   # 旧版本可能缓存过非 JSON 响应，丢弃并重新请求
+            if cached and cached.expires_at > time.time():
+                if not cached.payload:
+                    raise NotFoundError(f"HTTP 404 (cached): {url}")
+                return data
+            if cached and not cached.payload:
+                cached = None   # 过期的 404 记录没有可复用的内容，按首次请求处理
+
+        request_headers = dict((headers() if callable(headers) else headers) or {})
+        if cached and cached.etag:
+            request_headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            request_headers["If-Modified-Since"] = cached.last_modified
+        try:
+            response = self.request("GET", url, params=params, headers=request_headers)
+        except NotFoundError:
+            if self.cache is not None and ttl > 0:
+                self.cache.put(key, CacheEntry(b"", None, None, time.time() + min(ttl, NOT_FOUND_TTL)))
+            raise
+
+        if response.status_code == 304 and cached:
+            self.cache.put(key, cached._replace(expires_at=time.time() + ttl))
+            return data
+        # 先解析再缓存：非 JSON 的 200 响应不能进入缓存，否则已结束赛事会永久读到坏数据
+        data = _loads(response.content, url)
+        if self.cache is not None:
+            self.cache.put(key, CacheEntry(
+                response.content,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                time.time() + ttl,
+            ))
+        return data
+
+    def get_public(self, path: str, params: dict | None = None, *, ttl: float = 0.0):
         url = f"{PUBLIC_API_BASE}/{path.lstrip('/')}"
-        return self.request("GET", url, params=params).json()
+        return self.get_json(url, params=params, ttl=ttl)
 
-    def post_public(self, path: str, payload: dict):
+    def post_public(self, path: str, payload: dict, *, ttl: float = 0.0):
+        """POST 查询；ttl > 0 时按 url + payload 缓存响应（POST 没有条件请求，过期后直接重取）。"""
         url = f"{PUBLIC_API_BASE}/{path.lstrip('/')}"
-        return self.request(
+        key = "POST " + ResponseCache.key(url, payload)
+        use_cache = self.cache is not None and ttl > 0
+        if use_cache and not self.force_refresh:
+            cached = self.cache.get(key)
+            if cached and cached.payload and cached.expires_at > time.time():
+                try:
+                    return _loads(cached.payload, url)
+                except InvalidResponseError:
+                    pass    # 旧版本可能缓存过非 JSON 响应，重新请求覆盖
+
+        content = self.request(
             "POST",
             url,
             json_payload=payload,
             headers={"Content-Type": "application/json", "X-Requested-With": "XMLHttpRequest"},
-        ).json()
+        ).content
+        data = _loads(content, url)
+        if use_cache:
+            self.cache.put(key, CacheEntry(content, None, None, time.time() + ttl))
+        return data
 
     def event_context(self, event: dict) -> dict[str, str]:
         event_id = _event_entity_id(event)
         if event_id in self._event_context:
             return self._event_context[event_id]
 
+        # 同一赛事只取一次 CSRF，其他线程等待结果
+        with self._context_locks.setdefault(event_id, threading.Lock()):
+            if event_id not in self._event_context:
+                self._event_context[event_id] = self._load_event_context(event, event_id)
+        return self._event_context[event_id]
+
+    def _load_event_context(self, event: dict, event_id: int) -> dict[str, str]:
         sku = event.get("sku")
         if not sku:
             raise NotFoundError(f"Event {event_id} missing sku")
@@ -149,47 +417,90 @@ class EventsVexClient:
         if not match:
             raise RuntimeError(f"未能从赛事页获取 CSRF token: {referer}")
 
-        context = {"csrf": match.group(1), "referer": referer}
-        self._event_context[event_id] = context
-        return context
+        return {"csrf": match.group(1), "referer": referer}
 
-    def get_v2(self, event: dict, endpoint: str, params: dict | None = None):
-        context = self.event_context(event)
+    def _v2_target(self, event: dict, endpoint: str):
+        """返回 (url, 请求头函数, 缓存 ttl)；分页时只需计算一次。"""
         url = f"{PUBLIC_V2_BASE}/{endpoint.lstrip('/')}"
-        headers = {
-            "Accept": "application/json",
-            "X-Requested-With": "XMLHttpRequest",
-            "X-CSRF-TOKEN": context["csrf"],
-            "Referer": context["referer"],
-        }
-        return self.request("GET", url, params=params, headers=headers).json()
+
+        def headers() -> dict[str, str]:
+            context = self.event_context(event)
+            return {
+                "Accept": "application/json",
+                "X-Requested-With": "XMLHttpRequest",
+                "X-CSRF-TOKEN": context["csrf"],
+                "Referer": context["referer"],
+            }
+
+        # 已结束的赛事缓存永久有效；进行中的赛事每次都重新验证
+        ttl = float("inf") if _event_is_final(event) else 0.0
+        return url, headers, ttl
+
+    def get_v2(self, event: dict, endpoint: str, params: dict | None = None):
+        url, headers, ttl = self._v2_target(event, endpoint)
+        return self.get_json(url, params=params, headers=headers, ttl=ttl)
 
     def paginate_v2(self, event: dict, endpoint: str, params: dict | None = None) -> list[dict]:
+        """先取第 1 页得到 last_page，其余页并发抓取，结果按页序拼接。
+
+        默认每页 PAGE_SIZE 条；若服务器以 400/422 拒绝该页大小，之后整个进程改用 FALLBACK_PAGE_SIZE。
+        服务器静默截断页大小时 last_page 会相应变大，结果依然完整。
+        """
+        url, headers, ttl = self._v2_target(event, endpoint)
         params = dict(params or {})
-        params.setdefault("per_page", 250)
+
+        def fetch_page(page: int) -> dict:
+            return self.get_json(url, params={**params, "page": page}, headers=headers, ttl=ttl)
+
+        first = fetch_page(1) if "per_page" in params else self._first_page_default_size(params, fetch_page)
+        last_page = int(first.get("meta", {}).get("last_page") or 1)
+        pages = [first, *self._page_pool.map(fetch_page, range(2, last_page + 1))]
+
         results: list[dict] = []
-        page = 1
-        while True:
-            params["page"] = page
-            payload = self.get_v2(event, endpoint, params=params)
+        for page, payload in enumerate(pages, start=1):
             batch = payload.get("data", [])
             results.extend(batch)
-            meta = payload.get("meta", {})
-            last_page = int(meta.get("last_page") or 1)
             log.debug("  %s page=%d/%d, fetched=%d", endpoint, page, last_page, len(batch))
-            if page >= last_page:
-                break
-            page += 1
         return results
 
+    def _first_page_default_size(self, params: dict, fetch_page) -> dict:
+        """用默认页大小取第 1 页（写入 params["per_page"]，后续页沿用）。
+
+        页大小确认前各线程在锁内依次探测，只有 400/422 才视为页大小被拒绝并回退，
+        因此回退最多发生一次；429、403 等其他错误原样抛出，不影响页大小。
+        """
+        if not self._page_size_settled:
+            with self._page_size_lock:
+                if not self._page_size_settled:
+                    params["per_page"] = self._page_size
+                    try:
+                        first = fetch_page(1)
+                    except ClientError as exc:
+                        if exc.status not in {400, 422} or self._page_size <= FALLBACK_PAGE_SIZE:
+                            raise
+                        log.info("per_page=%d 被拒绝，改用 %d", self._page_size, FALLBACK_PAGE_SIZE)
+                        self._page_size = params["per_page"] = FALLBACK_PAGE_SIZE
+                        first = fetch_page(1)
+                    self._page_size_settled = True
+                    return first
+        params["per_page"] = self._page_size
+        return fetch_page(1)
+
 
 CLIENT = EventsVexClient()
+
+
+def _parallel_map(fn, items: list) -> list:
+    """在线程池中对每个元素执行 fn，结果保持与 items 相同的顺序。"""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        return list(pool.map(fn, items))
 
 
 # ─── Season 查找 ────────────────────────────────────────────────────────────────
+@functools.lru_cache(maxsize=4)
 def get_vurc_season_id(year: int = SEASON_YEAR) -> int:
-    """返回 VEX U 指定赛季的 season ID。"""
-    payload = CLIENT.get_public("programs")
+    """返回 VEX U 指定赛季的 season ID；赛季 id 不会变，--loop 模式下进程内只查一次。"""
+    payload = CLIENT.get_public("programs", ttl=PROGRAMS_TTL)
     programs = payload.get("data", payload if isinstance(payload, list) else [])
     program = next((p for p in programs if int(p.get("id", -1)) == PROGRAM_ID), None)
     if not program:
@@ -219,7 +530,7 @@ def fetch_events(season_id: int) -> list[dict]:
         "lat": 32,
         "lng": -96,
     }
-    rows = CLIENT.post_public("events", payload).get("data", [])
+    rows = CLIENT.post_public("events", payload, ttl=EVENTS_TTL).get("data", [])
     events = [
         row for row in rows
         if int(row.get("program_id", PROGRAM_ID)) == PROGRAM_ID
@@ -231,36 +542,46 @@ def fetch_events(season_id: int) -> list[dict]:
     return events
 
 
-def fetch_teams(season_id: int, events: list[dict]) -> list[str]:
-    """返回本赛季已出现在赛事报名列表中的队伍编号。"""
-    log.info("抓取 Teams (season=%d)，共 %d 个赛事...", season_id, len(events))
-    numbers: set[str] = set()
-    for ev in events:
-        event_id = _event_entity_id(ev)
-        try:
-            rows = CLIENT.paginate_v2(ev, f"events/{event_id}/teams")
-        except NotFoundError:
-            continue
-        except RuntimeError as exc:
-            log.warning("跳过 event %s 的 Teams: %s", event_id, exc)
-            continue
-        for row in rows:
-            number = row.get("number") or row.get("team", {}).get("name")
-            if number:
-                numbers.add(str(number))
-    result = sorted(numbers)
-    log.info("共 %d 支队伍", len(result))
-    return result
+def _event_team_numbers(ev: dict) -> list[str]:
+    """返回单个赛事报名列表中的队伍编号。"""
+    event_id = _event_entity_id(ev)
+    try:
+        rows = CLIENT.paginate_v2(ev, f"events/{event_id}/teams")
+    except NotFoundError:
+        return []
+    except RuntimeError as exc:
+        log.warning("跳过 event %s 的 Teams: %s", event_id, exc)
+        return []
+    numbers = []
+    for row in rows:
+        number = row.get("number") or row.get("team", {}).get("name")
+        if number:
+            numbers.append(str(number))
+    return numbers
 
 
 def _team_number(team: dict | None) -> str:
+    """取队伍编号并驻留（intern）：同一队伍在成千上万条记录里共享一个字符串对象，
+    后续 team_idx 等字典查找可直接按指针比较。"""
     if not team:
         return ""
-    return str(team.get("number") or team.get("name") or team.get("code") or "")
+    return sys.intern(str(team.get("number") or team.get("name") or team.get("code") or ""))
+
+
+MATCH_COLUMNS = ["event_id", "match_id", "started_at", "red_teams", "blue_teams", "red_score", "blue_score"]
 
 
-def _parse_match(m: dict, eid: int) -> dict | None:
-    """将 API 返回的 match 对象解析为标准记录，失败返回 None。"""
+def _parse_started(started: str):
+    """在抓取线程里把 ISO-8601 时间解析成 datetime；无法解析的原样返回，交给 pandas 统一处理。"""
+    try:
+        # Python 3.10 的 fromisoformat 不认识 “Z” 后缀
+        return datetime.datetime.fromisoformat(started[:-1] + "+00:00" if started.endswith("Z") else started)
+    except (TypeError, ValueError, AttributeError):
+        return started
+
+
+def _parse_match(m: dict, eid: int) -> tuple | None:
+    """将 API 返回的 match 对象解析为按 MATCH_COLUMNS 排列的元组，失败返回 None。"""
     started = m.get("started") or m.get("started_at")
     if not started:
         # 未来赛程通常只有 scheduled，没有 started 和有效比分，不能计入 Elo。
@@ -268,169 +589,216 @@ def _parse_match(m: dict, eid: int) -> dict | None:
     alliances = m.get("alliances", [])
     if len(alliances) < 2:
         return None
-    red  = next((a for a in alliances if a.get("color") == "red"),  alliances[0])
-    blue = next((a for a in alliances if a.get("color") == "blue"), alliances[1])
-    red_teams  = [_team_number(t.get("team")) for t in red.get("teams", [])]
-    blue_teams = [_team_number(t.get("team")) for t in blue.get("teams", [])]
-    red_teams  = [t for t in red_teams if t]
-    blue_teams = [t for t in blue_teams if t]
+    # 一次遍历按颜色建表（同色取第一个），找不到时按位置兜底
+    by_color: dict = {}
+    for a in alliances:
+        by_color.setdefault(a.get("color"), a)
+    red  = by_color.get("red",  alliances[0])
+    blue = by_color.get("blue", alliances[1])
+    red_teams  = [n for t in red.get("teams", [])  if (n := _team_number(t.get("team")))]
+    blue_teams = [n for t in blue.get("teams", []) if (n := _team_number(t.get("team")))]
     if not red_teams or not blue_teams:
         return None
-    return {
-        "event_id":   eid,
-        "match_id":   m.get("id"),
-        "started_at": started,
-        "red_teams":  red_teams,
-        "blue_teams": blue_teams,
-        "red_score":  red.get("score",  0) or 0,
-        "blue_score": blue.get("score", 0) or 0,
-    }
+    return (
+        eid,
+        m.get("id"),
+        _parse_started(started),
+        red_teams,
+        blue_teams,
+        red.get("score",  0) or 0,
+        blue.get("score", 0) or 0,
+    )
 
 
-def fetch_matches(season_id: int, events: list[dict]) -> pd.DataFrame:
-    """
-    先通过 /events/{id} 获取 divisions，再抓取 /events/{id}/divisions/{order}/matches。
-    返回按 started_at 全局排序的 DataFrame。
-    """
-    log.info("抓取 Matches，共 %d 个赛事...", len(events))
-    records = []
-    skipped = 0
-    has_data = 0
-
-    for ev in events:
-        eid = _event_entity_id(ev)
-        ev_records: list[dict] = []
-
-        try:
-            event_detail = CLIENT.get_v2(ev, f"events/{eid}")
-        except NotFoundError:
-            skipped += 1
-            continue
-        except RuntimeError as exc:
-            log.warning("跳过 event %d 的详情: %s", eid, exc)
-            skipped += 1
-            continue
-
-        divisions = event_detail.get("divisions", [])
-        if not divisions:
-            log.debug("Event %d 无 divisions 信息，跳过", eid)
-            skipped += 1
-            continue
-
-        for div in divisions:
-            did = div.get("order") or div.get("id") if isinstance(div, dict) else div
-            try:
-                matches = CLIENT.paginate_v2(ev, f"events/{eid}/divisions/{did}/matches")
-            except NotFoundError:
-                continue
-            except RuntimeError:
-                log.warning("跳过 event %d / division %d (服务器错误)", eid, did)
-                continue
-            for m in matches:
-                rec = _parse_match(m, eid)
-                if rec:
-                    ev_records.append(rec)
-
-        if ev_records:
-            has_data += 1
-            log.debug("Event %d: %d 场比赛", eid, len(ev_records))
-        else:
-            skipped += 1
+def fetch_event_bundle(ev: dict) -> tuple[list[str], list, list[dict] | None]:
+    """
+    一次访问单个赛事需要的全部“赛事级”数据：报名队伍、/events/{id} 的 divisions 与 /events/{id}/skills。
+    返回 (队伍编号, division 编号列表, skills 行)；skills 为 None 表示该赛事没有 Skills 数据（404）。
+    """
+    eid = _event_entity_id(ev)
+    team_numbers = _event_team_numbers(ev)
+    divisions: list = []
+    try:
+        event_detail = CLIENT.get_v2(ev, f"events/{eid}")
+        divisions = event_detail.get("divisions", [])
+        if not divisions:
+            log.debug("Event %d 无 divisions 信息，跳过", eid)
+    except NotFoundError:
+        pass
+    except RuntimeError as exc:
+        log.warning("跳过 event %d 的详情: %s", eid, exc)
+
+    try:
+        skill_rows = CLIENT.paginate_v2(ev, f"events/{eid}/skills")
+    except NotFoundError:
+        skill_rows = None
+    except RuntimeError:
+        log.warning("跳过 event %d 的 Skills (服务器错误)", eid)
+        skill_rows = []
+
+    dids = [div.get("order") or div.get("id") if isinstance(div, dict) else div for div in divisions]
+    return team_numbers, dids, skill_rows
+
+
+def fetch_event_data(events: list[dict]) -> tuple[list[str], pd.DataFrame, pd.DataFrame]:
+    """
+    抓取所有赛事的 Teams / Matches / Skills，返回 (teams, matches, skills)。
 
-        records.extend(ev_records)
+    第一轮每个赛事只访问一次（fetch_event_bundle），同时拿到报名队伍、divisions 和 skills；
+    第二轮把所有 (event, division) 展平成一个任务列表并发抓取 matches。
+    两轮都在同一个线程池里执行，请求速率由客户端的令牌桶统一控制。
+    """
+    log.info("抓取 Teams / Matches / Skills，共 %d 个赛事（%d 线程）...", len(events), MAX_WORKERS)
+    bundles = _parallel_map(fetch_event_bundle, events)
 
-    log.info("有数据赛事: %d / %d，跳过: %d", has_data, len(events), skipped)
-
-    df = pd.DataFrame(records)
-    if df.empty:
-        log.warning("未抓取到任何 Match 数据")
-        return pd.DataFrame(columns=[
-            "event_id", "match_id", "started_at", "red_teams", "blue_teams", "red_score", "blue_score"
-        ])
+    teams = sorted({number for numbers, _, _ in bundles for number in numbers})
+    log.info("共 %d 支队伍", len(teams))
 
-    df["started_at"] = pd.to_datetime(df["started_at"], utc=True, errors="coerce")
+    tasks = [
+        (ev, _event_entity_id(ev), did)
+        for ev, (_, dids, _) in zip(events, bundles)
+        for did in dids
+    ]
+
+    def fetch_division(task: tuple) -> list[tuple]:
+        ev, eid, did = task
+        try:
+            matches = CLIENT.paginate_v2(ev, f"events/{eid}/divisions/{did}/matches")
+        except NotFoundError:
+            return []
+        except RuntimeError:
+            log.warning("跳过 event %d / division %d (服务器错误)", eid, did)
+            return []
+        return [rec for rec in (_parse_match(m, eid) for m in matches) if rec]
+
+    records = []
+    events_with_data: set[int] = set()
+    for (_, eid, _), div_records in zip(tasks, _parallel_map(fetch_division, tasks)):
+        if div_records:
+            events_with_data.add(eid)
+        records.extend(div_records)
+    has_data = len(events_with_data)
+    log.info("有数据赛事: %d / %d，跳过: %d", has_data, len(events), len(events) - has_data)
+
+    return teams, _matches_frame(records), _skills_frame([rows for _, _, rows in bundles])
+
+
+def _matches_frame(records: list[tuple]) -> pd.DataFrame:
+    """由 _parse_match 的记录构建按 started_at 全局排序的 DataFrame。"""
+    if not records:
+        log.warning("未抓取到任何 Match 数据")
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+
+    # 按列构建并直接指定窄类型，避免逐行推断；队伍列表列保持 object
+    event_id, match_id, started_at, red_teams, blue_teams, red_score, blue_score = zip(*records)
+    df = pd.DataFrame({
+        "event_id":   np.array(event_id, dtype=np.int32),
+        "match_id":   pd.array(match_id, dtype="Int64"),
+        # RobotEvents 的时间带有各地时区偏移，不能直接按字符串排序；_parse_match 已解析成 datetime，
+        # 这里只做时区换算。个别未能解析的字符串按 ISO8601 走 C 解析，避免退回逐个 dateutil 解析
+        "started_at": pd.to_datetime(pd.Series(started_at), utc=True, errors="coerce", format="ISO8601"),
+        "red_teams":  pd.Series(red_teams, dtype=object),
+        "blue_teams": pd.Series(blue_teams, dtype=object),
+        "red_score":  np.array(red_score, dtype=np.int32),
+        "blue_score": np.array(blue_score, dtype=np.int32),
+    })
     df = df.sort_values("started_at").reset_index(drop=True)
     log.info("共 %d 场比赛（全局排序完成）", len(df))
     return df
 
 
-
-def fetch_skills(events: list[dict]) -> pd.DataFrame:
+def _skills_frame(rows_by_event: list[list[dict] | None]) -> pd.DataFrame:
     """
     返回每支队伍本赛季最高 driver / programming 分数。
     列：team_name, driver_skills, programming_skills
-
-    复用已获取的 events 列表，逐个抓取 /events/{id}/skills。
     """
-    log.info("抓取 Skills，共 %d 个赛事...", len(events))
-
-    best: dict[str, dict] = {}
-    _404_count = 0
-    for ev in events:
-        eid = _event_entity_id(ev)
-        try:
-            rows = CLIENT.paginate_v2(ev, f"events/{eid}/skills")
-        except NotFoundError:
-            _404_count += 1
-            continue
-        except RuntimeError:
-            log.warning("跳过 event %d 的 Skills (服务器错误)", eid)
+    # 只收集 (队伍, 类型, 分数) 三列，取最大值用 np.maximum.at 按队伍下标一次完成
+    names: list[str] = []
+    types: list[str] = []
+    scores: list[int] = []
+    _404_count = 0
+    for rows in rows_by_event:
+        if rows is None:
+            _404_count += 1
             continue
-
-        for r in rows:
-            team = _team_number(r.get("team"))
-            if not team:
-                continue
-            stype = r.get("type", "")   # "driver" | "programming"
-            score = r.get("score", 0) or 0
-            if team not in best:
-                best[team] = {"driver_skills": 0, "programming_skills": 0}
-            if stype == "driver":
-                best[team]["driver_skills"] = max(best[team]["driver_skills"], score)
-            elif stype == "programming":
-                best[team]["programming_skills"] = max(best[team]["programming_skills"], score)
+        for r in rows:
+            team = _team_number(r.get("team"))
+            if team:
+                names.append(team)
+                types.append(r.get("type", ""))      # "driver" | "programming"
+                scores.append(r.get("score", 0) or 0)
 
     if _404_count:
         log.info("共 %d 个赛事无 Skills 数据，已跳过", _404_count)
 
-
-    df = pd.DataFrame(
-        [{"team_name": k, **v} for k, v in best.items()],
-        columns=["team_name", "driver_skills", "programming_skills"],
-    )
+    codes, teams = pd.factorize(pd.Series(names), sort=False)
+    types_arr = np.array(types, dtype=object)
+    score_arr = np.array(scores, dtype=np.int64)
+    best = {}
+    for kind in ("driver", "programming"):
+        out = np.zeros(len(teams), dtype=np.int64)      # 与原逻辑一致：最高分从 0 起算
+        mask = types_arr == kind
+        np.maximum.at(out, codes[mask], score_arr[mask])
+        best[kind] = out
+    df = pd.DataFrame({
+        "team_name":          teams,
+        "driver_skills":      best["driver"],
+        "programming_skills": best["programming"],
+    })
     log.info("共 %d 支队伍有技能赛数据", len(df))
     return df
 
 
 # ─── Elo + SoS 计算 ─────────────────────────────────────────────────────────────
-def compute_elo_sos(matches_df: pd.DataFrame, all_teams: list[str]) -> pd.DataFrame:
-    """
-    返回包含 [team_name, elo, strength_of_schedule] 的 DataFrame。
+def _team_csr(column: pd.Series, team_idx: dict[str, int]) -> tuple[np.ndarray, np.ndarray]:
+    """把每场比赛的队伍列表展平为 (ids, offsets)：第 i 场为 ids[offsets[i]:offsets[i + 1]]。"""
+    lengths = np.fromiter((len(ts) for ts in column), dtype=np.int32, count=len(column))
+    offsets = np.zeros(len(column) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    ids = np.fromiter((team_idx[t] for ts in column for t in ts), dtype=np.int32, count=int(offsets[-1]))
+    return ids, offsets
+
+
+def _run_elo(
+    red_ids: np.ndarray,
+    red_off: np.ndarray,
+    blue_ids: np.ndarray,
+    blue_off: np.ndarray,
+    red_score: np.ndarray,
+    blue_score: np.ndarray,
+    n_teams: int,
+    elo: list[float] | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按时间顺序逐场更新 Elo，返回 (最终 Elo 数组, 交手对 a 下标, 交手对 b 下标)。
+
+    输入全部是整数数组（CSR 形式的队伍下标 + 比分），不涉及 pandas / 字符串。
+    比赛之间存在先后依赖只能顺序执行；单场内是 2v2 级别的小循环，标量运算比 numpy 广播更快，
+    因此数组先转成 list 再循环。传入 elo 时在其基础上继续更新（增量计算）。
+    每次两两对局记录一个 (a, b) 交手对，SoS 由调用方在最终 Elo 上统一计算。
     """
-    elo: dict[str, float] = defaultdict(lambda: float(INITIAL_ELO))
-    opponents: dict[str, list[str]] = defaultdict(list)
-
-    # 初始化所有已知队伍
-    for t in all_teams:
-        _ = elo[t]   # 触发 defaultdict 初始化
-
-    def update(winner_teams: list[str], loser_teams: list[str], draw: bool):
-        for a in winner_teams:
-            for b in loser_teams:
-                ea = 1 / (1 + 10 ** ((elo[b] - elo[a]) / 400))
+    red_ids, red_off = red_ids.tolist(), red_off.tolist()
+    blue_ids, blue_off = blue_ids.tolist(), blue_off.tolist()
+    if elo is None:
+        elo = [float(INITIAL_ELO)] * n_teams
+    # 交手对直接追加到 C int 缓冲区，结束时零拷贝转成 numpy 数组
+    pair_a = array.array("i")
+    pair_b = array.array("i")
+
+    def update(winner_ids: list[int], loser_ids: list[int], draw: bool):
+        for a in winner_ids:
+            for b in loser_ids:
+                ea = 1 / (1 + math.exp((elo[b] - elo[a]) * LN10_OVER_400))
                 eb = 1 - ea
                 sa = 0.5 if draw else 1.0
                 sb = 0.5 if draw else 0.0
                 elo[a] += K_FACTOR * (sa - ea)
                 elo[b] += K_FACTOR * (sb - eb)
-                opponents[a].append(b)
-                opponents[b].append(a)
-
-    for _, row in matches_df.iterrows():
-        red   = row["red_teams"]
-        blue  = row["blue_teams"]
-        rs    = row["red_score"]
-        bs    = row["blue_score"]
+                pair_a.append(a)
+                pair_b.append(b)
+
+    for m, (rs, bs) in enumerate(zip(red_score.tolist(), blue_score.tolist())):
+        red  = red_ids[red_off[m]:red_off[m + 1]]
+        blue = blue_ids[blue_off[m]:blue_off[m + 1]]
         if not red or not blue:
             continue
         if rs > bs:
@@ -440,191 +808,137 @@ def compute_elo_sos(matches_df: pd.DataFrame, all_teams: list[str]) -> pd.DataFr
         else:
             update(red, blue, draw=True)
 
-    # 计算 SoS
-    sos: dict[str, float] = {}
-    for team, opps in opponents.items():
-        if opps:
-            sos[team] = sum(elo[o] for o in opps) / len(opps)
-        else:
-            sos[team] = float(INITIAL_ELO)
+    return np.asarray(elo), np.frombuffer(pair_a, dtype=np.int32), np.frombuffer(pair_b, dtype=np.int32)
 
-    records = [
-        {"team_name": t, "elo": round(elo[t], 2), "strength_of_schedule": round(sos.get(t, INITIAL_ELO), 4)}
-        for t in elo
-    ]
-    return pd.DataFrame(records)
 
+def _strength_of_schedule(elo_arr: np.ndarray, pair_a: np.ndarray, pair_b: np.ndarray) -> np.ndarray:
+    """SoS = 对手最终 Elo 的均值（重复交手重复计入），无对手的队伍取初始值。"""
+    n = len(elo_arr)
+    count = np.bincount(pair_a, minlength=n) + np.bincount(pair_b, minlength=n)
+    total = (np.bincount(pair_a, weights=elo_arr[pair_b], minlength=n)
+             + np.bincount(pair_b, weights=elo_arr[pair_a], minlength=n))
+    sos = np.full(n, float(INITIAL_ELO))
+    np.divide(total, count, out=sos, where=count > 0)
+    return sos
 
-# ─── 静态 HTML 输出 ─────────────────────────────────────────────────────────────
-RANKINGS_DIR = Path(__file__).parent / "rankings"
 
+def _match_hashes(matches_df: pd.DataFrame) -> np.ndarray:
+    """每场比赛一个 64 位指纹（id、时间、双方队伍、比分），用于判断已处理的前缀是否变化。"""
+    return pd.util.hash_pandas_object(pd.DataFrame({
+        "match_id":   matches_df["match_id"],
+        "started_at": matches_df["started_at"],
+        "red_teams":  matches_df["red_teams"].map(",".join),
+        "blue_teams": matches_df["blue_teams"].map(",".join),
+        "red_score":  matches_df["red_score"],
+        "blue_score": matches_df["blue_score"],
+    }), index=False).to_numpy()
 
-def generate_interactive_html(df: pd.DataFrame) -> None:
-    """
-    根据 DataFrame 生成一个带原生 JS 交互的单文件 HTML（暗黑主题）。
-    输出到 rankings/index.html，可直接部署到 GitHub Pages。
-    """
-    RANKINGS_DIR.mkdir(exist_ok=True)
-
-    expected_columns = ["team_name", "elo", "strength_of_schedule", "driver_skills", "programming_skills"]
-    for column in expected_columns:
-        if column not in df.columns:
-            df[column] = pd.Series(dtype="float64" if column != "team_name" else "object")
-
-    has_skills = df[df["programming_skills"] > 0].copy()
-    no_skills  = df[df["programming_skills"] == 0].copy()
-
-    fig = go.Figure()
-
-    if df.empty:
-        fig.add_annotation(
-            text=f"No completed match data yet for VURC {SEASON_LABEL}: {GAME_NAME}.",
-            x=0.5,
-            y=0.5,
-            xref="paper",
-            yref="paper",
-            showarrow=False,
-            font=dict(size=18, color="#8b949e"),
-        )
 
-    # ── 1) 有 skills 的队伍
-    if not has_skills.empty:
-        bubble_size = np.sqrt(has_skills["programming_skills"].values) * 2
-        fig.add_trace(go.Scatter(
-            x=has_skills["strength_of_schedule"],
-            y=has_skills["elo"],
-            mode="markers+text",
-            text=has_skills["team_name"],
-            textposition="top center",
-            textfont=dict(size=9, color="#c9d1d9"),
-            marker=dict(
-                size=bubble_size,
-                color=has_skills["driver_skills"],
-                colorscale="Plasma",
-                colorbar=dict(
-                    title=dict(text="Driver Skills", side="top", font=dict(color="#c9d1d9")),
-                    tickvals=[0, 20, 40, 60, 80, 100, 120, 140],
-                    tickfont=dict(color="#8b949e"),
-                    x=1.01, xanchor="left", yanchor="middle", y=0.5,
-                    len=0.75, thickness=16,
-                ),
-                line=dict(width=0.5, color="rgba(255,255,255,0.25)"),
-                opacity=0.82,
-                showscale=True,
-            ),
-            hovertemplate=(
-                "<b>%{text}</b><br>"
-                "SoS: %{x:.4f}<br>"
-                "Elo: %{y:.1f}<br>"
-                "Driver: %{customdata[0]}<br>"
-                "Programming: %{customdata[1]}"
-                "<extra></extra>"
-            ),
-            customdata=has_skills[["driver_skills", "programming_skills"]].values,
-            name="有 Skills 数据",
-        ))
+def _elo_params() -> np.ndarray:
+    """写入状态文件的模型参数；与当前参数不一致的状态不可复用。"""
+    return np.array([ELO_STATE_VERSION, K_FACTOR, INITIAL_ELO], dtype=np.float64)
 
-    # ── 2) 无 skills 的队伍
-    if not no_skills.empty:
-        fig.add_trace(go.Scatter(
-            x=no_skills["strength_of_schedule"],
-            y=no_skills["elo"],
-            mode="markers+text",
-            text=no_skills["team_name"],
-            textposition="top center",
-            textfont=dict(size=9, color="#8b949e"),
-            marker=dict(
-                size=3,
-                color="#484f58",
-                symbol="circle",
-                opacity=0.7,
-                line=dict(width=0.5, color="rgba(255,255,255,0.1)"),
-            ),
-            hovertemplate=(
-                "<b>%{text}</b><br>"
-                "SoS: %{x:.4f}<br>"
-                "Elo: %{y:.1f}<br>"
-                "Skills: N/A"
-                "<extra></extra>"
-            ),
-            name="无 Skills 数据",
-            showlegend=False,
-        ))
 
-    # ── 坐标轴
-    fig.update_xaxes(
-        title_text="Strength of Schedule",
-        range=[0.28, 0.82], dtick=0.05,
-        showgrid=True, gridcolor="#21262d", gridwidth=1,
-        zeroline=False, showline=False,
-        tickformat=".2f",
-        tickfont=dict(color="#8b949e"),
-        title_font=dict(color="#c9d1d9"),
-    )
-    if df.empty:
-        elo_min = INITIAL_ELO - 10
-        elo_max = INITIAL_ELO + 10
-        elo_pad = 10
-    else:
-        elo_min = df["elo"].min()
-        elo_max = df["elo"].max()
-        elo_pad = max((elo_max - elo_min) * 0.05, 10)
-    fig.update_yaxes(
-        title_text="Elo",
-        range=[elo_min - elo_pad, elo_max + elo_pad], dtick=50,
-        showgrid=True, gridcolor="#21262d", gridwidth=1,
-        zeroline=False, showline=False,
-        tickfont=dict(color="#8b949e"),
-        title_font=dict(color="#c9d1d9"),
-    )
+def _load_elo_state(
+    path: Path, row_hash: np.ndarray, team_idx: dict[str, int]
+) -> tuple[int, list[float], np.ndarray, np.ndarray] | None:
+    """读取上次保存的 Elo 状态，映射到当前的队伍下标。
 
-    # ── 全局布局（暗黑主题）
-    fig.update_layout(
-        title=dict(
-            text=(
-                "Elo vs Strength of Schedule vs Skills Scores "
-                f"(Color = Driver, Size = Programming) ---VURC--- {SEASON_LABEL}"
-            ),
-            x=0, xanchor="left", font=dict(size=13, color="#e6edf3"),
-        ),
-        paper_bgcolor="#0d1117",
-        plot_bgcolor="#161b22",
-        height=800,
-        margin=dict(l=60, r=130, t=55, b=55),
-        font=dict(family="'Segoe UI', Arial, sans-serif", color="#c9d1d9"),
-        showlegend=False,
+    只有状态的版本 / K_FACTOR / INITIAL_ELO 与当前一致，且上次处理过的比赛恰好是
+    本次比赛序列的前缀时才可复用（Elo 依赖顺序），否则返回 None。
+    """
+    try:
+        with np.load(path, allow_pickle=False) as state:
+            if not np.array_equal(state["params"], _elo_params()):
+                log.info("Elo 状态的模型参数已变化，重新完整计算")
+                return None
+            prev_hash = state["row_hash"]
+            names, prev_elo = state["team_names"].tolist(), state["elo"].tolist()
+            pair_a, pair_b = state["pair_a"], state["pair_b"]
+    except (OSError, KeyError, ValueError) as exc:
+        log.debug("无法读取 Elo 状态 %s: %s", path, exc)
+        return None
+    start = len(prev_hash)
+    if start > len(row_hash) or not np.array_equal(prev_hash, row_hash[:start]):
+        return None
+
+    # 前缀一致时，旧状态里交过手的队伍必然都在 team_idx 中；其余旧队伍映射为 -1 且不会被引用
+    remap = np.array([team_idx.get(name, -1) for name in names], dtype=np.int32)
+    elo = [float(INITIAL_ELO)] * len(team_idx)
+    for j, e in zip(remap.tolist(), prev_elo):
+        if j >= 0:
+            elo[j] = e
+    return start, elo, remap[pair_a], remap[pair_b]
+
+
+def _save_elo_state(
+    path: Path, row_hash: np.ndarray, team_names: list[str],
+    elo_arr: np.ndarray, pair_a: np.ndarray, pair_b: np.ndarray,
+) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, params=_elo_params(), row_hash=row_hash, team_names=np.array(team_names, dtype=str),
+             elo=elo_arr, pair_a=pair_a, pair_b=pair_b)
+    tmp.replace(path)
+
+
+def compute_elo_sos(
+    matches_df: pd.DataFrame, all_teams: list[str], state_path: Path | None = None
+) -> pd.DataFrame:
+    """
+    返回包含 [team_name, elo, strength_of_schedule] 的 DataFrame。
+
+    队伍名先映射为整数下标，比赛展开为整数数组后交给 _run_elo；SoS 在最终 Elo 数组上用 numpy 计算。
+    给定 state_path 时会保存本次的 Elo 状态，下次若已处理的比赛仍是前缀，只需计算新增的比赛。
+    """
+    # 已知队伍在前，比赛中新出现的队伍按出现顺序追加
+    team_idx: dict[str, int] = {t: i for i, t in enumerate(dict.fromkeys(all_teams))}
+    for red, blue in zip(matches_df["red_teams"], matches_df["blue_teams"]):
+        for t in (*red, *blue):
+            team_idx.setdefault(t, len(team_idx))
+
+    start, elo = 0, None
+    prev_a = prev_b = np.empty(0, dtype=np.int32)
+    if state_path is not None:
+        row_hash = _match_hashes(matches_df)
+        state = _load_elo_state(state_path, row_hash, team_idx)
+        if state is not None:
+            start, elo, prev_a, prev_b = state
+            log.info("复用已保存的 Elo 状态：%d 场已计算，新增 %d 场", start, len(matches_df) - start)
+
+    new_matches = matches_df.iloc[start:]
+    red_ids, red_off   = _team_csr(new_matches["red_teams"], team_idx)
+    blue_ids, blue_off = _team_csr(new_matches["blue_teams"], team_idx)
+    elo_arr, pair_a, pair_b = _run_elo(
+        red_ids, red_off, blue_ids, blue_off,
+        new_matches["red_score"].to_numpy(), new_matches["blue_score"].to_numpy(),
+        len(team_idx), elo,
     )
+    pair_a = np.concatenate([prev_a, pair_a])
+    pair_b = np.concatenate([prev_b, pair_b])
+    if state_path is not None:
+        _save_elo_state(state_path, row_hash, list(team_idx), elo_arr, pair_a, pair_b)
 
-    # ── 将队伍数据导出为 JSON，供 JS 端检索（不依赖 Plotly 内部数据结构）
-    team_lookup = {}
-    for _, row in df.iterrows():
-        team_lookup[row["team_name"].upper()] = {
-            "team": row["team_name"],
-            "elo": round(float(row["elo"]), 1),
-            "sos": round(float(row["strength_of_schedule"]), 4),
-            "driver": int(row["driver_skills"]),
-            "prog": int(row["programming_skills"]),
-        }
-    import json
-    team_json = json.dumps(team_lookup, ensure_ascii=False)
+    sos_arr = _strength_of_schedule(elo_arr, pair_a, pair_b)
 
-    # ── 生成 UTC+8 时间戳
-    utc8 = datetime.timezone(datetime.timedelta(hours=8))
-    update_time = datetime.datetime.now(utc8).strftime("%Y-%m-%d %H:%M:%S")
+    return pd.DataFrame({
+        "team_name":            list(team_idx),
+        "elo":                  np.round(elo_arr, 2),
+        "strength_of_schedule": np.round(sos_arr, 4),
+    })
 
-    # ── 导出 HTML 片段
-    plot_html = fig.to_html(
-        full_html=False,
-        include_plotlyjs="cdn",
-        div_id="vurc-plot",
-    )
 
-    # ── 构建完整 HTML 页面
-    html_template = f"""<!DOCTYPE html>
+# ─── 静态 HTML 输出 ─────────────────────────────────────────────────────────────
+RANKINGS_DIR = Path(__file__).parent / "rankings"
+
+
+# 页面外壳在导入时构建并按占位符切分，每次刷新只需填入图表、队伍数据和更新时间
+_HTML_SHELL = f"""<!DOCTYPE html>
 <html lang="en" data-theme="dark" data-lang="en">
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <meta name="data-digest" content="\x00data_digest\x00">
   <title>VURC {SEASON_LABEL} Rankings</title>
   <style>
     *, *::before, *::after {{ box-sizing: border-box; margin: 0; padding: 0; }}
@@ -787,16 +1101,16 @@ def generate_interactive_html(df: pd.DataFrame) -> None:
     <button class="btn btn-toggle" id="btn-lang" title="Switch language">中</button>
   </div>
   <div class="status-bar">
-    <span id="update-label" data-i18n="updated">Last updated: {update_time} (UTC+8) \u00b7 Auto-refresh every 6 hours</span>
+    <span id="update-label" data-i18n="updated">Last updated: \x00update_time\x00 (UTC+8) \u00b7 Auto-refresh every 6 hours</span>
   </div>
   <div id="info-panel"></div>
   <div id="chart-container">
-    {plot_html}
+    \x00plot_html\x00
   </div>
 
   <script>
-  var TEAM_DATA = {team_json};
-  var UPDATE_TIME = '{update_time}';
+  var TEAM_DATA = \x00team_json\x00;
+  var UPDATE_TIME = '\x00update_time\x00';
   (function() {{
     var graphDiv  = document.getElementById('vurc-plot');
     var input     = document.getElementById('team-input');
@@ -1101,23 +1415,235 @@ def generate_interactive_html(df: pd.DataFrame) -> None:
 </html>
 """
 
+# 偶数下标为静态文本，奇数下标为占位符名
+_HTML_PARTS = _HTML_SHELL.split("\x00")
+_HTML_DIGEST_RE = re.compile(rb'<meta name="data-digest" content="([0-9a-f]*)">')
+
+
+def _html_digest(path: Path) -> str | None:
+    """读取已生成页面中记录的数据摘要，文件不存在或没有摘要时返回 None。"""
+    try:
+        with open(path, "rb") as f:
+            match = _HTML_DIGEST_RE.search(f.read(4096))
+    except OSError:
+        return None
+    return match.group(1).decode() if match else None
+
+
+@functools.lru_cache(maxsize=1)
+def _plotlyjs_script_tag() -> str:
+    """CDN 上与本地 plotly 同版本的 plotly.js 脚本标签，带 SRI 校验（算法与 fig.to_html(include_plotlyjs="cdn") 相同）。"""
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    sri = "sha256-" + base64.b64encode(hashlib.sha256(get_plotlyjs().encode("utf-8")).digest()).decode("ascii")
+    return (
+        f'<script charset="utf-8" src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"'
+        f' integrity="{sri}" crossorigin="anonymous"></script>'
+    )
+
+
+def generate_interactive_html(df: pd.DataFrame, data_digest: str = "") -> None:
+    """
+    根据 DataFrame 生成一个带原生 JS 交互的单文件 HTML（暗黑主题）。
+    输出到 rankings/index.html，可直接部署到 GitHub Pages。
+    data_digest 写入页面 <meta name="data-digest">，供下次判断数据是否有变化。
+    """
+    # plotly 只在生成 HTML 时需要，延迟导入以缩短抓取进程的启动时间和常驻内存
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    RANKINGS_DIR.mkdir(exist_ok=True)
+
+    expected_columns = ["team_name", "elo", "strength_of_schedule", "driver_skills", "programming_skills"]
+    for column in expected_columns:
+        if column not in df.columns:
+            df[column] = pd.Series(dtype="float64" if column != "team_name" else "object")
+
+    has_skills = df[df["programming_skills"] > 0].copy()
+    no_skills  = df[df["programming_skills"] == 0].copy()
+
+    fig = go.Figure()
+
+    if df.empty:
+        fig.add_annotation(
+            text=f"No completed match data yet for VURC {SEASON_LABEL}: {GAME_NAME}.",
+            x=0.5,
+            y=0.5,
+            xref="paper",
+            yref="paper",
+            showarrow=False,
+            font=dict(size=18, color="#8b949e"),
+        )
+
+    # ── 1) 有 skills 的队伍
+    if not has_skills.empty:
+        # 渲染用 float32 足够，原地乘 2 避免多一份临时数组
+        bubble_size = np.sqrt(has_skills["programming_skills"].to_numpy(), dtype=np.float32)
+        bubble_size *= 2
+        fig.add_trace(go.Scatter(
+            x=has_skills["strength_of_schedule"],
+            y=has_skills["elo"],
+            mode="markers+text",
+            text=has_skills["team_name"],
+            textposition="top center",
+            textfont=dict(size=9, color="#c9d1d9"),
+            marker=dict(
+                size=bubble_size,
+                color=has_skills["driver_skills"],
+                colorscale="Plasma",
+                colorbar=dict(
+                    title=dict(text="Driver Skills", side="top", font=dict(color="#c9d1d9")),
+                    tickvals=[0, 20, 40, 60, 80, 100, 120, 140],
+                    tickfont=dict(color="#8b949e"),
+                    x=1.01, xanchor="left", yanchor="middle", y=0.5,
+                    len=0.75, thickness=16,
+                ),
+                line=dict(width=0.5, color="rgba(255,255,255,0.25)"),
+                opacity=0.82,
+                showscale=True,
+            ),
+            hovertemplate=(
+                "<b>%{text}</b><br>"
+                "SoS: %{x:.4f}<br>"
+                "Elo: %{y:.1f}<br>"
+                "Driver: %{customdata[0]}<br>"
+                "Programming: %{customdata[1]}"
+                "<extra></extra>"
+            ),
+            customdata=has_skills[["driver_skills", "programming_skills"]].to_numpy(),
+            name="有 Skills 数据",
+        ))
+
+    # ── 2) 无 skills 的队伍
+    if not no_skills.empty:
+        fig.add_trace(go.Scatter(
+            x=no_skills["strength_of_schedule"],
+            y=no_skills["elo"],
+            mode="markers+text",
+            text=no_skills["team_name"],
+            textposition="top center",
+            textfont=dict(size=9, color="#8b949e"),
+            marker=dict(
+                size=3,
+                color="#484f58",
+                symbol="circle",
+                opacity=0.7,
+                line=dict(width=0.5, color="rgba(255,255,255,0.1)"),
+            ),
+            hovertemplate=(
+                "<b>%{text}</b><br>"
+                "SoS: %{x:.4f}<br>"
+                "Elo: %{y:.1f}<br>"
+                "Skills: N/A"
+                "<extra></extra>"
+            ),
+            name="无 Skills 数据",
+            showlegend=False,
+        ))
+
+    # ── 坐标轴
+    fig.update_xaxes(
+        title_text="Strength of Schedule",
+        range=[0.28, 0.82], dtick=0.05,
+        showgrid=True, gridcolor="#21262d", gridwidth=1,
+        zeroline=False, showline=False,
+        tickformat=".2f",
+        tickfont=dict(color="#8b949e"),
+        title_font=dict(color="#c9d1d9"),
+    )
+    if df.empty:
+        elo_min = INITIAL_ELO - 10
+        elo_max = INITIAL_ELO + 10
+        elo_pad = 10
+    else:
+        elo_min = df["elo"].min()
+        elo_max = df["elo"].max()
+        elo_pad = max((elo_max - elo_min) * 0.05, 10)
+    fig.update_yaxes(
+        title_text="Elo",
+        range=[elo_min - elo_pad, elo_max + elo_pad], dtick=50,
+        showgrid=True, gridcolor="#21262d", gridwidth=1,
+        zeroline=False, showline=False,
+        tickfont=dict(color="#8b949e"),
+        title_font=dict(color="#c9d1d9"),
+    )
+
+    # ── 全局布局（暗黑主题）
+    fig.update_layout(
+        title=dict(
+            text=(
+                "Elo vs Strength of Schedule vs Skills Scores "
+                f"(Color = Driver, Size = Programming) ---VURC--- {SEASON_LABEL}"
+            ),
+            x=0, xanchor="left", font=dict(size=13, color="#e6edf3"),
+        ),
+        paper_bgcolor="#0d1117",
+        plot_bgcolor="#161b22",
+        height=800,
+        margin=dict(l=60, r=130, t=55, b=55),
+        font=dict(family="'Segoe UI', Arial, sans-serif", color="#c9d1d9"),
+        showlegend=False,
+    )
+
+    # ── 将队伍数据导出为 JSON，供 JS 端检索（不依赖 Plotly 内部数据结构）
+    team_lookup = {
+        name.upper(): {
+            "team": name,
+            "elo": round(float(elo), 1),
+            "sos": round(float(sos), 4),
+            "driver": int(driver),
+            "prog": int(prog),
+        }
+        for name, elo, sos, driver, prog in zip(
+            df["team_name"].tolist(),
+            df["elo"].tolist(),
+            df["strength_of_schedule"].tolist(),
+            df["driver_skills"].tolist(),
+            df["programming_skills"].tolist(),
+        )
+    }
+    team_json = orjson.dumps(team_lookup).decode("utf-8").replace("</", "<\\/")
+
+    # ── 生成 UTC+8 时间戳
+    utc8 = datetime.timezone(datetime.timedelta(hours=8))
+    update_time = datetime.datetime.now(utc8).strftime("%Y-%m-%d %H:%M:%S")
+
+    # ── 导出 HTML 片段：图表已在构建时校验过，直接用 orjson 序列化，自己写 newPlot 调用
+    fig_json = pio.to_json(fig, validate=False, pretty=False, engine="orjson").replace("</", "<\\/")
+    plot_html = (
+        f'{_plotlyjs_script_tag()}\n'
+        '    <div id="vurc-plot" class="plotly-graph-div" style="height:100%; width:100%;"></div>\n'
+        f'    <script>var FIG = {fig_json}; Plotly.newPlot("vurc-plot", FIG.data, FIG.layout, {{"responsive": true}});</script>'
+    )
+
+    # ── 填充页面外壳
+    slots = {"plot_html": plot_html, "team_json": team_json, "update_time": update_time, "data_digest": data_digest}
+    html = "".join(slots[part] if i % 2 else part for i, part in enumerate(_HTML_PARTS))
+
     out_path = RANKINGS_DIR / "index.html"
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(html_template)
+    _write_atomic(out_path, html.encode("utf-8"))
     log.info("✓ 生成交互式 HTML: %s", out_path)
 
 
 # ─── 主函数 ──────────────────────────────────────────────────────────────────────
-def run_once() -> None:
-    """执行一次完整的数据拉取、计算、输出流程。"""
+def _write_atomic(path: Path, data: bytes) -> None:
+    """先写临时文件再原子替换，app.py 轮询时不会读到写了一半的文件。"""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+def run_once(force: bool = False) -> None:
+    """执行一次完整的数据拉取、计算、输出流程。
+
+    结果与上一轮完全相同时跳过写 CSV / 重新生成 HTML（force=True 时总是重写）。
+    """
     log.info("═══ 开始数据更新 ═══")
 
     season_id = get_vurc_season_id(SEASON_YEAR)
     events    = fetch_events(season_id)
-    teams     = fetch_teams(season_id, events)
 
-    matches   = fetch_matches(season_id, events)
-    skills    = fetch_skills(events)
+    teams, matches, skills = fetch_event_data(events)
 
     if matches.empty:
         log.warning("无已完成 Match 数据，将生成空 CSV/HTML。")
@@ -1125,7 +1651,7 @@ def run_once() -> None:
             "team_name", "elo", "strength_of_schedule", "driver_skills", "programming_skills"
         ])
     else:
-        elo_sos = compute_elo_sos(matches, teams)
+        elo_sos = compute_elo_sos(matches, teams, state_path=ELO_STATE)
 
         # 合并 skills
         df = elo_sos.merge(skills, on="team_name", how="left")
@@ -1133,7 +1659,8 @@ def run_once() -> None:
         df["programming_skills"] = df["programming_skills"].fillna(0).astype(int)
 
         # 过滤掉没有参加过任何比赛（SoS = 初始值 且 Elo = 初始值）的队伍
-        df = df[~((df["elo"] == INITIAL_ELO) & (df["strength_of_schedule"] == INITIAL_ELO))]
+        played = (df["elo"].to_numpy() != INITIAL_ELO) | (df["strength_of_schedule"].to_numpy() != INITIAL_ELO)
+        df = df[played]
 
         # 将 SoS 归一化到 ~ [0.3, 0.8]（按百分位线性映射）
         if len(df) > 1:
@@ -1143,11 +1670,22 @@ def run_once() -> None:
                 df["strength_of_schedule"] = 0.30 + (df["strength_of_schedule"] - raw_min) / (raw_max - raw_min) * 0.50
                 df["strength_of_schedule"] = df["strength_of_schedule"].round(4)
 
-    df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
-    log.info("✓ 写入 %s (%d 支队伍)", OUTPUT_CSV, len(df))
-
-    # 生成静态交互式 HTML（用于 GitHub Pages 部署）
-    generate_interactive_html(df)
+    # 整份 CSV 在内存中生成一次，再一次性写入
+    csv_bytes = df.to_csv(index=False).encode("utf-8")
+    if not force and OUTPUT_CSV.exists() and OUTPUT_CSV.read_bytes() == csv_bytes:
+        log.info("数据无变化，跳过写入 %s", OUTPUT_CSV)
+    else:
+        _write_atomic(OUTPUT_CSV, csv_bytes)
+        log.info("✓ 写入 %s (%d 支队伍)", OUTPUT_CSV, len(df))
+
+    # 生成静态交互式 HTML（用于 GitHub Pages 部署）；摘要同时覆盖数据、页面模板和 plotly.js 脚本标签，
+    # CI 上没有上一轮的 CSV，因此以页面里记录的摘要为准
+    page_template = (_HTML_SHELL + _plotlyjs_script_tag()).encode("utf-8")
+    digest = hashlib.blake2b(csv_bytes + page_template, digest_size=16).hexdigest()
+    if not force and _html_digest(RANKINGS_DIR / "index.html") == digest:
+        log.info("数据无变化，跳过生成 HTML")
+    else:
+        generate_interactive_html(df, digest)
 
     log.info("═══ 数据更新完成 ═══")
 
@@ -1156,15 +1694,22 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="VURC 数据抓取引擎")
     parser.add_argument("--loop", type=int, default=0,
                         help="循环间隔秒数，0 表示只运行一次")
+    parser.add_argument("--force", action="store_true",
+                        help="忽略本地 API 缓存，全部重新下载")
     args = parser.parse_args()
 
+    CLIENT.cache = ResponseCache(CACHE_DB)
+    CLIENT.force_refresh = args.force
+    if args.force:
+        ELO_STATE.unlink(missing_ok=True)
+
     if args.loop > 0:
         log.info("循环模式：每 %d 秒更新一次", args.loop)
         while True:
             try:
-                run_once()
+                run_once(force=args.force)
             except Exception as exc:
                 log.error("本轮更新失败: %s", exc)
             time.sleep(args.loop)
     else:
-        run_once()
+        run_once(force=args.force)
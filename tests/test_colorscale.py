@@ -0,0 +1,19 @@
+import plotly.graph_objects as go
+
+from app import _driver_colorscale
+
+
+def test_driver_colorscale_stops_are_valid():
+    for d_min in range(0, 200):
+        for d_max in range(d_min, 200):
+            colorscale, grey_value, c_max = _driver_colorscale(float(d_min), float(d_max))
+            stops = [stop for stop, _ in colorscale]
+            assert stops[0] == 0.0
+            assert stops[-1] == 1.0
+            assert all(a <= b for a, b in zip(stops, stops[1:]))
+            assert grey_value < d_min <= c_max
+
+
+def test_driver_colorscale_accepted_by_plotly():
+    colorscale, grey_value, c_max = _driver_colorscale(0.0, 22.0)
+    go.Scattergl(marker=dict(color=[grey_value, c_max], colorscale=colorscale))